@@ -4,6 +4,11 @@ from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 # Import with error handling
 try:
     from database import db
@@ -45,6 +50,18 @@ CORS(app, origins=os.getenv('CORS_ORIGINS', '*'))
 # Configuração da aplicação
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'a-default-secret-key-that-should-be-changed')
 
+# Compressão HTTP (gzip/brotli); o PDF já vem com streams comprimidos, mas a
+# estrutura de objetos ainda reduz 20-40%
+if Compress:
+    app.config['COMPRESS_MIMETYPES'] = [
+        'application/pdf', 'application/json', 'text/html', 'text/css',
+        'text/javascript', 'application/javascript'
+    ]
+    app.config['COMPRESS_LEVEL'] = 6
+    Compress(app)
+else:
+    logger.warning("Flask-Compress not available, responses will not be compressed")
+
 # Registrar blueprints
 if user_bp:
     app.register_blueprint(user_bp, url_prefix='/api')
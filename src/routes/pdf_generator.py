@@ -1,155 +1,388 @@
 import os
 import io
+import gzip
+import json
+import threading
+import concurrent.futures
+import copy
+import functools
+import hashlib
+import itertools
+import multiprocessing
+import uuid
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+from typing import Any, Dict, List, Union
+from xml.sax.saxutils import escape
+from flask import Blueprint, Response, request, jsonify
+from werkzeug.utils import secure_filename
+from cachetools import TTLCache
+from reportlab import rl_config
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch, cm
-from reportlab.lib.colors import HexColor, white, black, blue, orange
+from reportlab.lib.units import inch
+from reportlab.lib.colors import HexColor, white
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.platypus.flowables import HRFlowable
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from reportlab.lib.utils import ImageReader
+from reportlab.platypus.paragraph import cleanBlockQuotedText
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY
+from reportlab.lib.utils import ImageReader, simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+except ImportError:
+    logger.warning("orjson not available, falling back to stdlib json")
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    logger.warning("msgpack not available, application/msgpack payloads will be rejected")
+    msgpack = None
+
+try:
+    # ReportLab picks these C helpers (string widths, fp_str, frag merging)
+    # up on its own; the import only tells us whether they are installed
+    import _rl_accel  # noqa: F401
+except ImportError:
+    logger.warning("rl_accel not available, ReportLab will use its slower pure-Python helpers")
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    logger.warning("pypdf not available, batch PDF generation disabled")
+    PdfReader = PdfWriter = None
+
 pdf_bp = Blueprint("pdf", __name__)
 
+# The report only uses the standard Helvetica faces, which are not embedded;
+# load their width tables at import instead of during the first request
+for _font_name in ('Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique'):
+    pdfmetrics.getFont(_font_name)
+
+# Parsed once; HexColor re-parses its hex string on every call
+_TEXT_COLOR = HexColor('#333333')
+_MUTED_COLOR = HexColor('#666666')
+_PRIMARY_COLOR = HexColor('#0056b3')
+_ACCENT_COLOR = HexColor('#007bff')
+_CAPTION_COLOR = HexColor('#999999')
+_QUOTE_COLOR = HexColor('#555555')
+_QUOTE_BG_COLOR = HexColor('#f0f0f0')
+_GRID_COLOR = HexColor('#cccccc')
+
+# invariant=1 drops the creation timestamp and random document ID from the
+# PDF metadata. The visible "Gerado em" timestamp on the cover and the date in
+# each footer still change between builds, so equal reports are not byte-equal
+_TEMPLATE_KWARGS = dict(pagesize=A4, topMargin=inch, bottomMargin=inch, pageCompression=1, invariant=1)
+
+# Flate-compressed streams are written as binary instead of being wrapped in
+# ASCII85: ReportLab's encoder is pure Python and re-encoding the logo on
+# every page was most of the build time, and A85 also grows streams by 25%.
+# zlib itself stays at its default level; it is a small share of the build
+rl_config.useA85 = 0
+
+# Upper bound on items rendered from LLM-generated lists, so an oversized
+# payload cannot balloon the document
+_MAX_LIST_ITEMS = 50
+
+# Page header/footer geometry, computed once instead of on every page
+_HEADER_TEXT_X = inch + 0.6 * inch
+_HEADER_TITLE_Y = A4[1] - 0.75 * inch
+_HEADER_SUBTITLE_Y = A4[1] - 0.9 * inch
+_FOOTER_Y = 0.75 * inch
+_FOOTER_RIGHT_X = A4[0] - inch
+_FOOTER_LEFT_TEXT = "Relatório de Arqueologia de Avatar | Gerado por: Up"
+_LOGO_SIZE = 0.5 * inch
+_LOGO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'logo.png')
+
+def _load_logo_bytes():
+    if not os.path.exists(_LOGO_PATH):
+        return None
+    try:
+        with open(_LOGO_PATH, 'rb') as f:
+            data = f.read()
+        ImageReader(io.BytesIO(data))
+        return data
+    except Exception as e:
+        logger.warning(f"Could not load logo: {e}")
+        return None
+
+# Only the file bytes are shared: an ImageReader keeps its own file pointer
+# and decode state, so concurrent builds each open their own reader
+_LOGO_BYTES = _load_logo_bytes()
+
+_KV_COL_WIDTHS = [2 * inch, 4.25 * inch]
+# Cells narrower than these fit their column (minus default right padding) on one line
+_KV_LABEL_MAX_WIDTH = _KV_COL_WIDTHS[0] - 6
+_KV_VALUE_MAX_WIDTH = _KV_COL_WIDTHS[1] - 6
+_PAIN_COL_WIDTHS_4 = [0.35 * inch, 3.5 * inch, 1.2 * inch, 1.2 * inch]
+_PAIN_COL_WIDTHS_3 = [0.35 * inch, 3.5 * inch, 2.4 * inch]
+_ACTION_COL_WIDTHS = [0.35 * inch, 3.2 * inch, 1.5 * inch, 1.2 * inch]
+
+# Gap between sections, applied as CustomHeading1's spaceBefore. Where a real
+# Spacer is still needed each story gets its own: the doc template flags a
+# flowable that didn't fit (_postponed) and raises LayoutError if the same
+# object fails to fit again, so Spacers can't be shared between stories
+_SECTION_GAP = 0.3 * inch
+
+# Shared table styles: one Table per group lays out in a single pass instead
+# of wrapping and paginating a Paragraph per row
+_KV_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('TEXTCOLOR', (0, 0), (-1, -1), _TEXT_COLOR),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+_GRID_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), _PRIMARY_COLOR),
+    ('TEXTCOLOR', (0, 0), (-1, 0), white),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 0.5, _GRID_COLOR),
+])
+
+def _text(value, default='N/A'):
+    """Format a JSON value for the report, using `default` for missing values instead of 'None'.
+
+    Empty strings, lists and dicts count as missing; 0 and False are real values.
+    """
+    if value is None or (not value and isinstance(value, (str, list, dict))):
+        return default
+    return value if type(value) is str else str(value)
+
+def _normalize(data, keys):
+    """Format the given keys of `data` once so callers can index the result directly."""
+    return {key: _text(data.get(key)) for key in keys}
+
+class ReportData(BaseModel):
+    """Top-level sections of the analysis payload rendered into the PDF.
+
+    Validated once per request so the generator can read sections as
+    attributes instead of probing the raw dict at every step.
+    """
+    model_config = ConfigDict(extra='allow')
+
+    escopo: Dict[str, Any] = Field(default_factory=dict)
+    avatar_ultra_detalhado: Dict[str, Any] = Field(default_factory=dict)
+    mapeamento_dores_ultra_detalhado: Dict[str, Any] = Field(default_factory=dict)
+    estrategia_palavras_chave: Dict[str, Any] = Field(default_factory=dict)
+    analise_concorrencia_detalhada: Dict[str, Any] = Field(default_factory=dict)
+    metricas_performance_detalhadas: Dict[str, Any] = Field(default_factory=dict)
+    plano_acao_detalhado: List[Any] = Field(default_factory=list)
+    insights_exclusivos: List[Any] = Field(default_factory=list)
+    projecoes_cenarios: Dict[str, Any] = Field(default_factory=dict)
+
+    @model_validator(mode='before')
+    @classmethod
+    def _drop_null_sections(cls, values):
+        # Gemini sometimes emits null for sections it could not fill
+        if isinstance(values, dict):
+            return {k: v for k, v in values.items() if v is not None}
+        return values
+
+def _build_styles():
+    """Build the report stylesheet; called once at import and shared by every report."""
+    styles = getSampleStyleSheet()
+    
+    try:
+        styles.add(ParagraphStyle(
+            name='CustomTitle', 
+            fontSize=24, 
+            leading=28, 
+            alignment=TA_CENTER, 
+            textColor=_TEXT_COLOR,
+            fontName='Helvetica-Bold',
+            spaceAfter=20
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomSubtitle', 
+            fontSize=18, 
+            leading=22, 
+            alignment=TA_CENTER, 
+            textColor=_MUTED_COLOR,
+            fontName='Helvetica',
+            spaceAfter=15
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomHeading1', 
+            fontSize=16, 
+            leading=20, 
+            textColor=_PRIMARY_COLOR, 
+            spaceAfter=12, 
+            fontName='Helvetica-Bold',
+            # Carries the gap between sections, which used to be a trailing
+            # Spacer flowable per section; dropped at the top of a frame
+            spaceBefore=15 + _SECTION_GAP
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomHeading2', 
+            fontSize=14, 
+            leading=18, 
+            textColor=_ACCENT_COLOR, 
+            spaceAfter=10, 
+            fontName='Helvetica-Bold',
+            spaceBefore=10
+        ))
+        styles.add(ParagraphStyle(
+            name='CustomBodyText', 
+            fontSize=10, 
+            leading=14, 
+            textColor=_TEXT_COLOR, 
+            spaceAfter=6, 
+            alignment=TA_JUSTIFY,
+            fontName='Helvetica'
+            # wordWrap stays at the default (None), the plain word breaker: CJK
+            # mode split Portuguese words mid-word, and 'LTR'/'RTL' turn on
+            # ReportLab's bidi pass
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='BulletText', 
+            fontSize=10, 
+            leading=14, 
+            textColor=_TEXT_COLOR, 
+            leftIndent=20, 
+            bulletIndent=10, 
+            bulletFontName='Helvetica-Bold', 
+            bulletFontSize=10, 
+            bulletColor=_PRIMARY_COLOR,
+            spaceAfter=3
+        ))            
+        styles.add(ParagraphStyle(
+            name='CustomCaption', 
+            fontSize=8, 
+            leading=10, 
+            textColor=_CAPTION_COLOR, 
+            alignment=TA_CENTER, 
+            spaceAfter=6,
+            fontName='Helvetica'
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomListText', 
+            fontSize=10, 
+            leading=14, 
+            textColor=_TEXT_COLOR, 
+            leftIndent=20,
+            fontName='Helvetica',
+            spaceAfter=3,
+            allowOrphans=1
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomQuote', 
+            fontSize=10, 
+            leading=14, 
+            textColor=_QUOTE_COLOR, 
+            leftIndent=20, 
+            rightIndent=20, 
+            spaceBefore=10, 
+            spaceAfter=10, 
+            backColor=_QUOTE_BG_COLOR, 
+            borderPadding=5,
+            fontName='Helvetica-Oblique'
+        ))
+        
+        styles.add(ParagraphStyle(
+            name='CustomTableCell', 
+            fontSize=9, 
+            leading=12, 
+            textColor=_TEXT_COLOR, 
+            fontName='Helvetica'
+        ))
+        
+    except Exception as e:
+        logger.warning(f"Error creating custom styles: {e}. Using default styles.")
+
+    return styles
+
+_STYLES = _build_styles()
+
+# Fixed report content as data: (kind, text) blocks rendered by
+# PDFReportGenerator._render_blocks
+_BLOCK_STYLES = {
+    'h1': "CustomHeading1",
+    'h2': "CustomHeading2",
+    'body': "CustomBodyText",
+    'caption': "CustomCaption",
+}
+
+_CONCLUSION_BLOCKS = (
+    ('pagebreak', None),
+    ('h1', "Conclusão"),
+    ('body',
+     "Esta análise ultra-detalhada fornece uma base sólida para o desenvolvimento de "
+     "estratégias de marketing eficazes e o lançamento bem-sucedido do produto no mercado brasileiro. "
+     "Os insights apresentados foram gerados através de inteligência artificial avançada e "
+     "pesquisa em tempo real, garantindo informações atualizadas e relevantes."),
+    ('spacer', None),
+    ('caption', "Relatório gerado pela plataforma UP Lançamentos - Arqueologia do Avatar com IA"),
+)
+
+# Parsed Paragraphs for fixed headings and boilerplate, keyed by (text, style name)
+_PARAGRAPH_PROTOTYPES = {}
+
+class FastParagraph(Paragraph):
+    """Paragraph that skips ReportLab's markup parser for plain text.
+
+    Text without '<' or '&' parses to a single fragment carrying only the
+    style's font attributes, so that fragment is parsed once per style and
+    cloned with the new text. Anything with markup takes the normal path,
+    as do the halves Paragraph.split() builds from ready-made frags.
+    """
+
+    _frag_prototypes = {}
+
+    def __init__(self, text, style, **kwargs):
+        if text is None or 'frags' in kwargs or '<' in text or '&' in text or not text.strip():
+            super().__init__(text, style, **kwargs)
+            return
+        prototype = self._frag_prototypes.get(style.name)
+        if prototype is None:
+            prototype = self._frag_prototypes.setdefault(style.name, Paragraph('x', style).frags[0])
+        super().__init__(text, style, frags=[prototype.clone(text=cleanBlockQuotedText(text))], **kwargs)
+
 class PDFReportGenerator:
+    __slots__ = ('styles', '_style_map')
+
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        
-        try:
-            self.styles.add(ParagraphStyle(
-                name='CustomTitle', 
-                fontSize=24, 
-                leading=28, 
-                alignment=TA_CENTER, 
-                textColor=HexColor('#333333'),
-                fontName='Helvetica-Bold',
-                spaceAfter=20
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomSubtitle', 
-                fontSize=18, 
-                leading=22, 
-                alignment=TA_CENTER, 
-                textColor=HexColor('#666666'),
-                fontName='Helvetica',
-                spaceAfter=15
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomHeading1', 
-                fontSize=16, 
-                leading=20, 
-                textColor=HexColor('#0056b3'), 
-                spaceAfter=12, 
-                fontName='Helvetica-Bold',
-                spaceBefore=15
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomHeading2', 
-                fontSize=14, 
-                leading=18, 
-                textColor=HexColor('#007bff'), 
-                spaceAfter=10, 
-                fontName='Helvetica-Bold',
-                spaceBefore=10
-            ))
-            self.styles.add(ParagraphStyle(
-                name='CustomBodyText', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#333333'), 
-                spaceAfter=6, 
-                alignment=TA_JUSTIFY,
-                fontName='Helvetica',
-                wordWrap='CJK'
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='BulletText', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#333333'), 
-                leftIndent=20, 
-                bulletIndent=10, 
-                bulletFontName='Helvetica-Bold', 
-                bulletFontSize=10, 
-                bulletColor=HexColor('#0056b3'),
-                spaceAfter=3
-            ))            
-            self.styles.add(ParagraphStyle(
-                name='CustomCaption', 
-                fontSize=8, 
-                leading=10, 
-                textColor=HexColor('#999999'), 
-                alignment=TA_CENTER, 
-                spaceAfter=6,
-                fontName='Helvetica'
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomListText', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#333333'), 
-                leftIndent=20,
-                fontName='Helvetica',
-                spaceAfter=3
-            ))
-            
-            self.styles.add(ParagraphStyle(
-                name='CustomQuote', 
-                fontSize=10, 
-                leading=14, 
-                textColor=HexColor('#555555'), 
-                leftIndent=20, 
-                rightIndent=20, 
-                spaceBefore=10, 
-                spaceAfter=10, 
-                backColor=HexColor('#f0f0f0'), 
-                borderPadding=5,
-                fontName='Helvetica-Oblique'
-            ))
-            
-        except Exception as e:
-            logger.warning(f"Error creating custom styles: {e}. Using default styles.")
+        self.styles = _STYLES
+        # StyleSheet1.__getitem__ is a Python-level lookup with alias handling;
+        # the hot paths index a plain dict instead
+        self._style_map = dict(_STYLES.byName)
 
-    def _add_header_and_footer(self, canvas, doc):
+    def _add_header_and_footer(self, canvas, doc, current_date=None, logo=None):
         canvas.saveState()
         
         canvas.setFont('Helvetica-Bold', 10)
-        canvas.setFillColor(HexColor('#0056b3'))
+        canvas.setFillColor(_PRIMARY_COLOR)
         
-        logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'logo.png')
-        if os.path.exists(logo_path):
-            try:
-                logo = ImageReader(logo_path)
-                canvas.drawImage(logo, inch, A4[1] - 0.9 * inch, width=0.5*inch, height=0.5*inch, preserveAspectRatio=True)
-            except Exception as e:
-                logger.warning(f"Could not load logo: {e}")
+        if logo is not None:
+            canvas.drawImage(logo, inch, _HEADER_SUBTITLE_Y, width=_LOGO_SIZE, height=_LOGO_SIZE, preserveAspectRatio=True)
         
-        canvas.drawString(inch + 0.6 * inch, A4[1] - 0.75 * inch, "Relatório de Arqueologia de Avatar")
+        canvas.drawString(_HEADER_TEXT_X, _HEADER_TITLE_Y, "Relatório de Arqueologia de Avatar")
         canvas.setFont('Helvetica', 8)
-        canvas.drawString(inch + 0.6 * inch, A4[1] - 0.9 * inch, "Análise Ultra-Detalhada Concluída")
+        canvas.drawString(_HEADER_TEXT_X, _HEADER_SUBTITLE_Y, "Análise Ultra-Detalhada Concluída")
 
-        canvas.setFont('Helvetica', 8)
-        canvas.setFillColor(HexColor('#666666'))
-        page_num = canvas.getPageNumber()
-        report_name = "Relatório de Arqueologia de Avatar"
-        user_name = "Up"
-        current_date = datetime.now().strftime('%d/%m/%Y')
+        # Font is still Helvetica 8 from the subtitle; only the colour changes
+        canvas.setFillColor(_MUTED_COLOR)
+        current_date = current_date or datetime.now().strftime('%d/%m/%Y')
         
-        canvas.drawString(inch, 0.75 * inch, f"{report_name} | Gerado por: {user_name}")
+        canvas.drawString(inch, _FOOTER_Y, _FOOTER_LEFT_TEXT)
         
-        footer_right_text = f"Data: {current_date} | Página {page_num}"
+        footer_right_text = f"Data: {current_date} | Página {canvas.getPageNumber()}"
         text_width = canvas.stringWidth(footer_right_text, 'Helvetica', 8)
-        canvas.drawString(A4[0] - inch - text_width, 0.75 * inch, footer_right_text)
+        canvas.drawString(_FOOTER_RIGHT_X - text_width, _FOOTER_Y, footer_right_text)
         
         canvas.restoreState()
 
@@ -167,252 +400,590 @@ class PDFReportGenerator:
         except:
             return default
 
-    def generate_pdf_report(self, data: dict, filename: str):
-        try:
-            doc = SimpleDocTemplate(filename, pagesize=A4, topMargin=inch, bottomMargin=inch)
-            story = []
+    def _p(self, text, style_name):
+        """Paragraph from markup; report data must be escape()d before it is interpolated."""
+        return FastParagraph(text, self._style_map[style_name])
 
-            segmento = self._safe_get(data, 'escopo', 'segmento_principal', default='Segmento não especificado')
-            avatar_data = data.get('avatar_ultra_detalhado', {})
-            persona = avatar_data.get('persona_principal', {})
-            
-            story.append(Paragraph("Relatório de Arqueologia de Avatar", self.styles["CustomTitle"]))
-            story.append(Spacer(1, 0.3 * inch))
-            story.append(Paragraph(f"Análise Ultra-Detalhada: {segmento}", self.styles["CustomSubtitle"]))
-            story.append(Spacer(1, 0.5 * inch))
-            story.append(Paragraph(f"Gerado em: {datetime.now().strftime('%d/%m/%Y às %H:%M')}", self.styles["CustomCaption"]))
-            story.append(PageBreak())
-
-            story.append(Paragraph("Resumo Executivo", self.styles["CustomHeading1"]))
-            story.append(Paragraph(
-                f"Este relatório apresenta uma análise ultra-detalhada do segmento {segmento}, "
+    def _numbered_list(self, lines, style_name="CustomListText"):
+        """Render numbered lines as one Paragraph instead of one flowable per item."""
+        return self._p("<br/>".join(f"{i}. {escape(line)}" for i, line in enumerate(lines, 1)), style_name)
+
+    def _static(self, text, style_name):
+        """Return a Paragraph for fixed report text, parsing its markup only once per process.
+
+        Each call hands out a shallow copy of a cached prototype: layout state
+        set by wrap()/split() lands on the copy, so concurrent builds never
+        share a flowable.
+        """
+        key = (text, style_name)
+        prototype = _PARAGRAPH_PROTOTYPES.get(key)
+        if prototype is None:
+            prototype = _PARAGRAPH_PROTOTYPES.setdefault(key, Paragraph(text, self._style_map[style_name]))
+        return copy.copy(prototype)
+
+    def _key_value_table(self, items):
+        """Render (label, value) pairs as one two-column Table.
+
+        Cells that fit on one line stay plain strings, which Table draws
+        directly; only longer labels and values pay for a wrapping Paragraph.
+        Labels often come from LLM keys, so they are checked too.
+        """
+        cell = self._style_map["CustomTableCell"]
+        rows = []
+        for label, value in items:
+            label = _text(label)
+            if pdfmetrics.stringWidth(label, 'Helvetica-Bold', 9) > _KV_LABEL_MAX_WIDTH:
+                label = FastParagraph(f"<b>{escape(label)}</b>", cell)
+            value = _text(value)
+            if pdfmetrics.stringWidth(value, 'Helvetica', 9) > _KV_VALUE_MAX_WIDTH:
+                value = FastParagraph(escape(value), cell)
+            rows.append([label, value])
+        return Table(rows, colWidths=_KV_COL_WIDTHS, style=_KV_TABLE_STYLE, hAlign='LEFT', splitInRow=1)
+
+    def _grid_table(self, items, header, fields, col_widths):
+        """Render one row per dict in `items`, with `fields` as the text columns after the index."""
+        cell = self._style_map["CustomTableCell"]
+        rows = [header]
+        for i, item in enumerate((d for d in items if isinstance(d, dict)), 1):
+            rows.append([str(i)] + [FastParagraph(escape(_text(item.get(field))), cell) for field in fields])
+        return Table(rows, colWidths=col_widths, style=_GRID_TABLE_STYLE, repeatRows=1, hAlign='LEFT', splitInRow=1)
+
+    def _draw_cover(self, canvas, doc, segmento, generated_at, logo=None):
+        """Draw the fixed-layout cover straight onto the first page's canvas."""
+        self._add_header_and_footer(canvas, doc, current_date=generated_at.strftime('%d/%m/%Y'), logo=logo)
+
+        canvas.saveState()
+        center_x = A4[0] / 2
+        y = A4[1] - 1.75 * inch
+
+        canvas.setFont('Helvetica-Bold', 24)
+        canvas.setFillColor(_TEXT_COLOR)
+        canvas.drawCentredString(center_x, y, "Relatório de Arqueologia de Avatar")
+        y -= 48 + 0.3 * inch
+
+        canvas.setFont('Helvetica', 18)
+        canvas.setFillColor(_MUTED_COLOR)
+        for line in simpleSplit(f"Análise Ultra-Detalhada: {segmento}", 'Helvetica', 18, doc.width):
+            canvas.drawCentredString(center_x, y, line)
+            y -= 22
+        y -= 15 + 0.5 * inch
+
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(_CAPTION_COLOR)
+        canvas.drawCentredString(center_x, y, f"Gerado em: {generated_at.strftime('%d/%m/%Y às %H:%M')}")
+        canvas.restoreState()
+
+    def create_executive_summary(self, segmento):
+        return [
+            self._static("Resumo Executivo", "CustomHeading1"),
+            self._p(
+                f"Este relatório apresenta uma análise ultra-detalhada do segmento {escape(segmento)}, "
                 "utilizando inteligência artificial avançada e pesquisa em tempo real na internet. "
                 "A análise revela insights profundos sobre o avatar ideal, estratégias de marketing "
-                "e oportunidades de mercado.", 
-                self.styles["CustomBodyText"]
+                "e oportunidades de mercado.",
+                "CustomBodyText"
+            ),
+        ]
+
+    def create_avatar_section(self, persona):
+        if not persona:
+            return []
+
+        return [
+            self._static("Perfil do Avatar Principal", "CustomHeading1"),
+            # Dynamically add all persona fields
+            self._key_value_table(
+                (key.replace('_', ' ').title(), value)
+                for key, value in persona.items()
+            ),
+        ]
+
+    def create_scope_section(self, escopo):
+        if not escopo:
+            return []
+
+        e = _normalize(escopo, ('segmento_principal', 'produto_ideal', 'proposta_valor'))
+        story = [
+            self._static("Escopo de Mercado", "CustomHeading1"),
+            self._p(f"Segmento Principal: {escape(e['segmento_principal'])}", "CustomBodyText"),
+            self._p(f"Produto Ideal: {escape(e['produto_ideal'])}", "CustomBodyText"),
+            self._p(f"Proposta de Valor: {escape(e['proposta_valor'])}", "CustomBodyText"),
+        ]
+
+        tamanho_mercado = escopo.get('tamanho_mercado', {})
+        if tamanho_mercado:
+            story.extend((
+                self._static("Tamanho do Mercado:", "CustomHeading2"),
+                self._key_value_table(
+                    (key.replace('_medio_segmento', '').replace('_', ' ').title(), value)
+                    for key, value in tamanho_mercado.items()
+                ),
+            ))
+        return story
+
+    def create_pain_section(self, dores):
+        if not dores:
+            return []
+
+        story = []
+        story.append(self._static("Mapeamento de Dores", "CustomHeading1"))
+
+        dores_criticas = dores.get('dores_nivel_1_criticas', [])
+        if dores_criticas:
+            story.append(self._static("Dores Críticas (Nível 1):", "CustomHeading2"))
+            story.append(self._grid_table(
+                dores_criticas, ["#", "Dor", "Intensidade", "Frequência"],
+                ('dor', 'intensidade', 'frequencia'), _PAIN_COL_WIDTHS_4
+            ))
+
+        dores_nivel_2 = dores.get('dores_nivel_2', [])
+        if dores_nivel_2:
+            story.append(self._static("Dores de Nível 2:", "CustomHeading2"))
+            story.append(self._grid_table(
+                dores_nivel_2, ["#", "Dor", "Impacto"],
+                ('dor', 'impacto'), _PAIN_COL_WIDTHS_3
             ))
-            story.append(Spacer(1, 0.3 * inch))
-
-            if persona:
-                story.append(Paragraph("Perfil do Avatar Principal", self.styles["CustomHeading1"]))
-                
-                # Dynamically add all persona fields
-                for key, value in persona.items():
-                    display_key = key.replace('_', ' ').title()
-                    story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomBodyText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            escopo = data.get('escopo', {})
-            if escopo:
-                story.append(Paragraph("Escopo de Mercado", self.styles["CustomHeading1"]))
-                story.append(Paragraph(f"Segmento Principal: {escopo.get('segmento_principal', 'N/A')}", self.styles["CustomBodyText"]))
-                story.append(Paragraph(f"Produto Ideal: {escopo.get('produto_ideal', 'N/A')}", self.styles["CustomBodyText"]))
-                story.append(Paragraph(f"Proposta de Valor: {escopo.get('proposta_valor', 'N/A')}", self.styles["CustomBodyText"]))
-                
-                tamanho_mercado = escopo.get('tamanho_mercado', {})
-                if tamanho_mercado:
-                    story.append(Paragraph("Tamanho do Mercado:", self.styles["CustomHeading2"]))
-                    for key, value in tamanho_mercado.items():
-                        display_key = key.replace('_medio_segmento', '').replace('_', ' ').title()
-                        story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            dores = data.get('mapeamento_dores_ultra_detalhado', {})
-            if dores:
-                story.append(Paragraph("Mapeamento de Dores", self.styles["CustomHeading1"]))
-                
-                dores_criticas = dores.get('dores_nivel_1_criticas', [])
-                if dores_criticas:
-                    story.append(Paragraph("Dores Críticas (Nível 1):", self.styles["CustomHeading2"]))
-                    for i, dor in enumerate(dores_criticas, 1):
-                        if isinstance(dor, dict):
-                            story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Intensidade: {dor.get('intensidade', 'N/A')} | Frequência: {dor.get('frequencia', 'N/A')}", self.styles["CustomListText"]))
-                
-                dores_nivel_2 = dores.get('dores_nivel_2', [])
-                if dores_nivel_2:
-                    story.append(Paragraph("Dores de Nível 2:", self.styles["CustomHeading2"]))
-                    for i, dor in enumerate(dores_nivel_2, 1):
-                        if isinstance(dor, dict):
-                            story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Impacto: {dor.get('impacto', 'N/A')}", self.styles["CustomListText"]))
-                
-                dores_nivel_3 = dores.get('dores_nivel_3', [])
-                if dores_nivel_3:
-                    story.append(Paragraph("Dores de Nível 3:", self.styles["CustomHeading2"]))
-                    for i, dor in enumerate(dores_nivel_3, 1):
-                        if isinstance(dor, dict):
-                            story.append(Paragraph(f"{i}. {dor.get('dor', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Causa Raiz: {dor.get('causa_raiz', 'N/A')}", self.styles["CustomListText"]))
-                       
-                story.append(Spacer(1, 0.3 * inch))
-
-            marketing = data.get('estrategia_palavras_chave', {})
-            if marketing:
-                story.append(Paragraph("Estratégia de Marketing", self.styles["CustomHeading1"]))
-                
-                palavras_primarias = marketing.get('palavras_primarias', [])
-                if palavras_primarias:
-                    story.append(Paragraph("Palavras-Chave Primárias:", self.styles["CustomHeading2"]))
-                    for i, palavra in enumerate(palavras_primarias, 1):
-                        if isinstance(palavra, dict):
-                            story.append(Paragraph(
-                                f"{i}. {palavra.get('termo', 'N/A')} - Volume: {palavra.get('volume_mensal', 'N/A')} - CPC: {palavra.get('cpc_estimado', 'N/A')}", 
-                                self.styles["CustomListText"]
-                            ))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            competicao = data.get('analise_concorrencia_detalhada', {})
-            if competicao:
-                story.append(Paragraph("Análise Competitiva", self.styles["CustomHeading1"]))
-                
-                concorrentes = competicao.get('concorrentes_diretos', [])
-                if concorrentes:
-                    story.append(Paragraph("Principais Concorrentes:", self.styles["CustomHeading2"]))
-                    for i, concorrente in enumerate(concorrentes, 1):
-                        if isinstance(concorrente, dict):
-                            story.append(Paragraph(f"{i}. {concorrente.get('nome', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Preço: {concorrente.get('preco_range', 'N/A')}", self.styles["CustomListText"]))
-                            story.append(Paragraph(f"   Posicionamento: {concorrente.get('posicionamento', 'N/A')}", self.styles["CustomListText"]))
-                
-                gaps = competicao.get('gaps_oportunidades', [])
-                if gaps:
-                    story.append(Paragraph("Oportunidades de Mercado:", self.styles["CustomHeading2"]))
-                    for i, gap in enumerate(gaps, 1):
-                        story.append(Paragraph(f"{i}. {gap}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            metricas = data.get('metricas_performance_detalhadas', {})
-            if metricas:
-                story.append(Paragraph("Métricas de Performance", self.styles["CustomHeading1"]))
-                
-                benchmarks = metricas.get('benchmarks_segmento', {})
-                if benchmarks:
-                    story.append(Paragraph("Benchmarks do Segmento:", self.styles["CustomHeading2"]))
-                    for key, value in benchmarks.items():
-                        display_key = key.replace('_medio_segmento', '').replace('_', ' ').title()
-                        story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            plano_acao = data.get('plano_acao_detalhado', [])
-            if plano_acao:
-                story.append(Paragraph("Plano de Ação", self.styles["CustomHeading1"]))
-                for fase in plano_acao:
-                    if isinstance(fase, dict):
-                        story.append(Paragraph(f"{fase.get('fase', 'Fase')}", self.styles["CustomHeading2"]))
-                        story.append(Paragraph(f"Duração: {fase.get('duracao', 'N/A')}", self.styles["CustomBodyText"]))
-                        
-                        acoes = fase.get('acoes', [])
-                        if acoes:
-                            for i, acao in enumerate(acoes, 1):
-                                if isinstance(acao, dict):
-                                    story.append(Paragraph(f"{i}. {acao.get('acao', 'N/A')}", self.styles["CustomListText"]))
-                                    story.append(Paragraph(f"   Responsável: {acao.get('responsavel', 'N/A')}", self.styles["CustomListText"]))
-                                    story.append(Paragraph(f"   Prazo: {acao.get('prazo', 'N/A')}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            insights = data.get('insights_exclusivos', [])
-            if insights:
-                story.append(Paragraph("Insights Exclusivos", self.styles["CustomHeading1"]))
-                for i, insight in enumerate(insights, 1):  # Display all insights
-                    if isinstance(insight, str):
-                        story.append(Paragraph(f"{i}. {insight}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            cenarios = data.get('projecoes_cenarios', {})
-            if cenarios:
-                story.append(Paragraph("Projeções de Cenários", self.styles["CustomHeading1"]))
-                
-                for cenario_nome in ['cenario_conservador', 'cenario_realista', 'cenario_otimista']:
-                    cenario = cenarios.get(cenario_nome, {})
-                    if cenario:
-                        nome_display = cenario_nome.replace('cenario_', '').replace('_', ' ').title()
-                        story.append(Paragraph(f"Cenário {nome_display}:", self.styles["CustomHeading2"]))
-                        for key, value in cenario.items():
-                            display_key = key.replace('_', ' ').title()
-                            story.append(Paragraph(f"{display_key}: {value if value else 'N/A'}", self.styles["CustomListText"]))
-                
-                story.append(Spacer(1, 0.3 * inch))
-
-            story.append(PageBreak())
-            story.append(Paragraph("Conclusão", self.styles["CustomHeading1"]))
-            story.append(Paragraph(
-                "Esta análise ultra-detalhada fornece uma base sólida para o desenvolvimento de "
-                "estratégias de marketing eficazes e o lançamento bem-sucedido do produto no mercado brasileiro. "
-                "Os insights apresentados foram gerados através de inteligência artificial avançada e "
-                "pesquisa em tempo real, garantindo informações atualizadas e relevantes.", 
-                self.styles["CustomBodyText"]
+
+        dores_nivel_3 = dores.get('dores_nivel_3', [])
+        if dores_nivel_3:
+            story.append(self._static("Dores de Nível 3:", "CustomHeading2"))
+            story.append(self._grid_table(
+                dores_nivel_3, ["#", "Dor", "Causa Raiz"],
+                ('dor', 'causa_raiz'), _PAIN_COL_WIDTHS_3
             ))
-            story.append(Spacer(1, 0.3 * inch))
-            story.append(Paragraph(
-                "Relatório gerado pela plataforma UP Lançamentos - Arqueologia do Avatar com IA", 
-                self.styles["CustomCaption"]
+        return story
+
+    def create_keywords_section(self, marketing):
+        if not marketing:
+            return []
+
+        story = []
+        story.append(self._static("Estratégia de Marketing", "CustomHeading1"))
+
+        palavras_primarias = marketing.get('palavras_primarias', [])
+        if palavras_primarias:
+            story.append(self._static("Palavras-Chave Primárias:", "CustomHeading2"))
+            keywords = (
+                _normalize(palavra, ('termo', 'volume_mensal', 'cpc_estimado'))
+                for palavra in itertools.islice(palavras_primarias, _MAX_LIST_ITEMS)
+                if isinstance(palavra, dict)
+            )
+            story.append(self._numbered_list(
+                f"{k['termo']} - Volume: {k['volume_mensal']} - CPC: {k['cpc_estimado']}" for k in keywords
             ))
+        return story
+
+    def create_competition_section(self, competicao):
+        if not competicao:
+            return []
+
+        story = []
+        story.append(self._static("Análise Competitiva", "CustomHeading1"))
+
+        concorrentes = competicao.get('concorrentes_diretos', [])
+        if concorrentes:
+            story.append(self._static("Principais Concorrentes:", "CustomHeading2"))
+            entries = (
+                _normalize(concorrente, ('nome', 'preco_range', 'posicionamento'))
+                for concorrente in concorrentes
+                if isinstance(concorrente, dict)
+            )
+            # One Paragraph for the whole list; <br/> separates the lines of each entry
+            story.append(self._p("<br/>".join(
+                f"{i}. {escape(c['nome'])}<br/>Preço: {escape(c['preco_range'])}"
+                f"<br/>Posicionamento: {escape(c['posicionamento'])}"
+                for i, c in enumerate(entries, 1)
+            ), "CustomListText"))
+
+        gaps = competicao.get('gaps_oportunidades', [])
+        if gaps:
+            story.append(self._static("Oportunidades de Mercado:", "CustomHeading2"))
+            story.append(self._numbered_list(_text(gap) for gap in gaps))
+        return story
+
+    def create_metrics_section(self, metricas):
+        if not metricas:
+            return []
+
+        story = []
+        story.append(self._static("Métricas de Performance", "CustomHeading1"))
+
+        benchmarks = metricas.get('benchmarks_segmento', {})
+        if benchmarks:
+            story.append(self._static("Benchmarks do Segmento:", "CustomHeading2"))
+            story.append(self._key_value_table(
+                (key.replace('_medio_segmento', '').replace('_', ' ').title(), value)
+                for key, value in benchmarks.items()
+            ))
+        return story
+
+    def create_action_plan_section(self, plano_acao):
+        if not plano_acao:
+            return []
+
+        story = []
+        story.append(self._static("Plano de Ação", "CustomHeading1"))
+        for fase in plano_acao:
+            if isinstance(fase, dict):
+                story.append(self._p(escape(_text(fase.get('fase'), 'Fase')), "CustomHeading2"))
+                story.append(self._p(f"Duração: {escape(_text(fase.get('duracao')))}", "CustomBodyText"))
+
+                acoes = fase.get('acoes', [])
+                if acoes:
+                    story.append(self._grid_table(
+                        acoes, ["#", "Ação", "Responsável", "Prazo"],
+                        ('acao', 'responsavel', 'prazo'), _ACTION_COL_WIDTHS
+                    ))
+        return story
+
+    def create_insights_section(self, insights):
+        if not insights:
+            return []
+
+        return [
+            self._static("Insights Exclusivos", "CustomHeading1"),
+            self._numbered_list(
+                insight for insight in itertools.islice(insights, _MAX_LIST_ITEMS) if isinstance(insight, str)
+            ),
+        ]
+
+    def create_projections_section(self, cenarios):
+        if not cenarios:
+            return []
+
+        story = []
+        story.append(self._static("Projeções de Cenários", "CustomHeading1"))
+
+        for cenario_nome in ['cenario_conservador', 'cenario_realista', 'cenario_otimista']:
+            cenario = cenarios.get(cenario_nome, {})
+            if cenario:
+                nome_display = cenario_nome.replace('cenario_', '').replace('_', ' ').title()
+                story.append(self._p(f"Cenário {nome_display}:", "CustomHeading2"))
+                story.append(self._key_value_table(
+                    (key.replace('_', ' ').title(), value) for key, value in cenario.items()
+                ))
+        return story
 
-            doc.build(story, onFirstPage=self._add_header_and_footer, onLaterPages=self._add_header_and_footer)
-            logger.info(f"Relatório PDF '{filename}' gerado com sucesso.")
+    def _render_blocks(self, blocks):
+        """Turn declarative (kind, text) blocks into flowables."""
+        story = []
+        for kind, text in blocks:
+            if kind == 'pagebreak':
+                story.append(PageBreak())
+            elif kind == 'spacer':
+                story.append(Spacer(1, _SECTION_GAP))
+            else:
+                story.append(self._static(text, _BLOCK_STYLES[kind]))
+        return story
+
+    def create_conclusion_section(self):
+        return self._render_blocks(_CONCLUSION_BLOCKS)
+
+    def generate_pdf_report(self, data: Union[ReportData, dict], output):
+        try:
+            report = data if isinstance(data, ReportData) else ReportData.model_validate(data)
+            doc = SimpleDocTemplate(output, **_TEMPLATE_KWARGS)
+
+            # Any JSON value can arrive here; format it once for the cover and summary
+            segmento = _text(self._safe_get(report.escopo, 'segmento_principal', default='Segmento não especificado'))
+            persona = report.avatar_ultra_detalhado.get('persona_principal', {})
+            # One timestamp for the cover and every page footer
+            generated_at = datetime.now()
+
+            sections = [
+                (self.create_executive_summary, segmento),
+                (self.create_avatar_section, persona),
+                (self.create_scope_section, report.escopo),
+                (self.create_pain_section, report.mapeamento_dores_ultra_detalhado),
+                (self.create_keywords_section, report.estrategia_palavras_chave),
+                (self.create_competition_section, report.analise_concorrencia_detalhada),
+                (self.create_metrics_section, report.metricas_performance_detalhadas),
+                (self.create_action_plan_section, report.plano_acao_detalhado),
+                (self.create_insights_section, report.insights_exclusivos),
+                (self.create_projections_section, report.projecoes_cenarios),
+                (self.create_conclusion_section,),
+            ]
+
+            # The cover is drawn by _draw_cover, so the story starts on page two.
+            # The story is the only owner of the flowables, so doc.build frees
+            # each one once it is laid out
+            story = [PageBreak()]
+            for builder, *args in sections:
+                story.extend(builder(*args))
+
+            # One reader per build; ReportLab embeds the image once per document
+            logo = ImageReader(io.BytesIO(_LOGO_BYTES)) if _LOGO_BYTES else None
+            on_page = functools.partial(self._add_header_and_footer, current_date=generated_at.strftime('%d/%m/%Y'), logo=logo)
+            on_cover = functools.partial(self._draw_cover, segmento=segmento, generated_at=generated_at, logo=logo)
+            # Single layout pass: the report has no table of contents, page-count
+            # footer or cross-references, so multiBuild's extra passes buy nothing
+            doc.build(story, onFirstPage=on_cover, onLaterPages=on_page)
+            logger.info("Relatório PDF gerado com sucesso.")
             return True
             
         except Exception as e:
             logger.error(f"Erro ao gerar o relatório PDF: {e}")
             return False
 
-@pdf_bp.route("/generate-pdf", methods=["POST"])
-def generate_pdf():
+# Generator is stateless per request (all report data flows through
+# generate_pdf_report arguments), so share one instance across requests
+pdf_generator = PDFReportGenerator()
+
+# Background PDF jobs run in-process: the deployment has no Redis/RQ, so
+# finished documents are kept in memory until they expire, so a download can
+# be retried. The registry is bounded, and new jobs are refused while it is
+# full rather than letting TTLCache evict jobs that are still running
+_PDF_JOB_TTL_SECONDS = 30 * 60
+_pdf_job_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+_pdf_jobs = TTLCache(maxsize=64, ttl=_PDF_JOB_TTL_SECONDS)
+_pdf_jobs_lock = threading.Lock()
+
+# Each batch worker is a separate interpreter holding a full build in memory,
+# so keep the pool small and reject batches that would queue for minutes
+_MAX_BATCH_REPORTS = 10
+_BATCH_WORKERS = min(2, os.cpu_count() or 1)
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+# Finished documents keyed by a hash of the validated report, so re-downloads
+# of an unchanged analysis skip the build entirely. The generation timestamp is
+# deliberately not part of the key: a hit returns the copy built up to an hour
+# earlier, with that build's cover time and footer date
+_pdf_cache = TTLCache(maxsize=32, ttl=60 * 60)
+_pdf_cache_lock = threading.Lock()
+
+def _report_cache_key(report):
+    return hashlib.blake2b(report.model_dump_json().encode('utf-8'), digest_size=16).hexdigest()
+
+def _get_cached_pdf(key):
+    with _pdf_cache_lock:
+        return _pdf_cache.get(key)
+
+def _store_cached_pdf(key, pdf):
+    with _pdf_cache_lock:
+        _pdf_cache[key] = pdf
+
+# Upper bound on a decoded request body; analyses are a few hundred KB of JSON
+_MAX_BODY_BYTES = 10 * 1024 * 1024
+
+def _decode_request_body():
+    """Decode the (optionally gzipped) JSON or msgpack request body.
+
+    Returns (data, None) on success or (None, error_response).
+    """
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "Dados não fornecidos"}), 400
+        if request.headers.get("Content-Encoding", "").lower() == "gzip":
+            # Inflate straight from the input stream; large analyses compress well.
+            # Reading one byte past the cap is enough to reject a gzip bomb
+            with gzip.GzipFile(fileobj=request.stream) as body_stream:
+                body = body_stream.read(_MAX_BODY_BYTES + 1)
+        else:
+            body = request.stream.read(_MAX_BODY_BYTES + 1)
+        if len(body) > _MAX_BODY_BYTES:
+            return None, (jsonify({"error": "Corpo da requisição muito grande"}), 413)
+        if request.mimetype == "application/msgpack":
+            if not msgpack:
+                return None, (jsonify({"error": "Formato msgpack não suportado"}), 415)
+            data = msgpack.unpackb(body, raw=False)
+        else:
+            data = orjson.loads(body) if orjson else json.loads(body)
+    except (OSError, EOFError):
+        return None, (jsonify({"error": "Corpo gzip inválido"}), 400)
+    except ValueError:
+        # Covers JSON decode errors and msgpack's ExtraData/FormatError
+        return None, (jsonify({"error": "Corpo da requisição inválido"}), 400)
+    if not data:
+        return None, (jsonify({"error": "Dados não fornecidos"}), 400)
+    return data, None
 
-        report_data = data.get("report_data", data)
-        user_id = data.get("user_id", "anonymous")
+def _download_filename(prefix, user_id):
+    """Attachment name for a report; user_id comes from the client, so only a safe ASCII token of it is kept."""
+    safe_user_id = secure_filename(str(user_id)) or "anonymous"
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{prefix}_{safe_user_id}_{timestamp}.pdf"
 
-        if not report_data:
-            return jsonify({"error": "Dados do relatório são obrigatórios"}), 400
+def _parse_report_request():
+    """Parse and validate the request body.
 
-        generator = PDFReportGenerator()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"relatorio_arqueologia_{user_id}_{timestamp}.pdf"
-        
-        temp_path = os.path.join("/tmp", filename)
-        
-        os.makedirs("/tmp", exist_ok=True)
-        
-        success = generator.generate_pdf_report(report_data, temp_path) 
-
-        if success and os.path.exists(temp_path):
-            def remove_file():
-                try:
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-                except:
-                    pass
-            
-            import atexit
-            atexit.register(remove_file)
-            
-            return send_file(
-                temp_path, 
-                as_attachment=True, 
-                download_name=filename,
-                mimetype='application/pdf'
+    Returns (report, filename, None) on success or (None, None, error_response).
+    """
+    data, error = _decode_request_body()
+    if error:
+        return None, None, error
+
+    report_data = data.get("report_data", data)
+    user_id = data.get("user_id", "anonymous")
+
+    if not report_data:
+        return None, None, (jsonify({"error": "Dados do relatório são obrigatórios"}), 400)
+
+    try:
+        report = ReportData.model_validate(report_data)
+    except ValidationError as e:
+        return None, None, (jsonify({"error": f"Dados do relatório inválidos: {e.errors(include_url=False, include_context=False)}"}), 400)
+
+    return report, _download_filename("relatorio_arqueologia", user_id), None
+
+def _run_pdf_job(job_id, report):
+    # Nothing else observes this thread, so any failure must land on the job
+    # or the client polls a pending status until the job expires
+    pdf = None
+    try:
+        key = _report_cache_key(report)
+        pdf = _get_cached_pdf(key)
+        if pdf is None:
+            buffer = io.BytesIO()
+            if pdf_generator.generate_pdf_report(report, buffer):
+                pdf = buffer.getvalue()
+                _store_cached_pdf(key, pdf)
+    except Exception as e:
+        logger.error(f"Erro no job de PDF {job_id}: {e}")
+        pdf = None
+    with _pdf_jobs_lock:
+        job = _pdf_jobs.get(job_id)
+        if job is not None:
+            job["status"] = "done" if pdf is not None else "error"
+            job["pdf"] = pdf
+
+def _render_report_bytes(report_data):
+    """Process-pool entry point: build one report and return the PDF bytes."""
+    buffer = io.BytesIO()
+    if not pdf_generator.generate_pdf_report(report_data, buffer):
+        raise RuntimeError("Falha ao gerar o relatório PDF")
+    return buffer.getvalue()
+
+def _get_batch_executor():
+    # Created on first use; spawn keeps children clear of the threads and
+    # locks gunicorn's preloaded parent already holds
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=_BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
             )
-        else:
+        return _batch_executor
+
+def generate_batch(reports):
+    """Render several reports in parallel processes and merge them into one PDF."""
+    parts = _get_batch_executor().map(_render_report_bytes, [report.model_dump() for report in reports])
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+@pdf_bp.route("/generate-pdf", methods=["POST"])
+def generate_pdf():
+    try:
+        report, filename, error = _parse_report_request()
+        if error:
+            return error
+        
+        key = _report_cache_key(report)
+        # The report content hash doubles as the ETag. It is a weak validator:
+        # copies of the same report differ in their generation timestamp, which
+        # is not part of the report's identity. No 304 is sent, since this is a
+        # POST and RFC 9110 only allows conditional 304s for GET and HEAD
+        headers = {"Content-Disposition": f'attachment; filename="{filename}"', "ETag": f'W/"{key}"'}
+        cached = _get_cached_pdf(key)
+        if cached is not None:
+            return Response(cached, mimetype='application/pdf', headers=headers)
+
+        # ReportLab serializes the whole document in one write at canvas.save(),
+        # so there is nothing to stream: build into memory and send the bytes
+        buffer = io.BytesIO()
+        if not pdf_generator.generate_pdf_report(report, buffer):
             return jsonify({"error": "Falha ao gerar o relatório PDF"}), 500
+        pdf = buffer.getvalue()
+        _store_cached_pdf(key, pdf)
+
+        return Response(pdf, mimetype='application/pdf', headers=headers)
 
     except Exception as e:
         logger.error(f"Erro na rota de geração de PDF: {e}")
         return jsonify({"error": f"Erro interno: {str(e)}"}), 500
 
+@pdf_bp.route("/pdf-jobs", methods=["POST"])
+def create_pdf_job():
+    try:
+        report, filename, error = _parse_report_request()
+        if error:
+            return error
+
+        job_id = uuid.uuid4().hex
+        with _pdf_jobs_lock:
+            if len(_pdf_jobs) >= _pdf_jobs.maxsize:
+                return jsonify({"error": "Muitos relatórios em processamento, tente novamente em instantes"}), 503
+            _pdf_jobs[job_id] = {"status": "pending", "filename": filename, "pdf": None}
+        _pdf_job_executor.submit(_run_pdf_job, job_id, report)
+
+        return jsonify({"job_id": job_id, "status": "pending"}), 202
+
+    except Exception as e:
+        logger.error(f"Erro ao enfileirar geração de PDF: {e}")
+        return jsonify({"error": f"Erro interno: {str(e)}"}), 500
+
+@pdf_bp.route("/pdf-status/<job_id>", methods=["GET"])
+def get_pdf_status(job_id):
+    with _pdf_jobs_lock:
+        job = _pdf_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job não encontrado"}), 404
+        return jsonify({"job_id": job_id, "status": job["status"]})
+
+@pdf_bp.route("/pdf-download/<job_id>", methods=["GET"])
+def download_pdf(job_id):
+    with _pdf_jobs_lock:
+        job = _pdf_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Job não encontrado"}), 404
+        if job["status"] == "pending":
+            return jsonify({"job_id": job_id, "status": "pending"}), 409
+        if job["status"] == "error":
+            return jsonify({"error": "Falha ao gerar o relatório PDF"}), 500
+        pdf, filename = job["pdf"], job["filename"]
+
+    return Response(
+        pdf,
+        mimetype='application/pdf',
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@pdf_bp.route("/pdf/batch", methods=["POST"])
+def generate_pdf_batch():
+    try:
+        if not PdfWriter:
+            return jsonify({"error": "Geração em lote indisponível"}), 501
+
+        data, error = _decode_request_body()
+        if error:
+            return error
+
+        reports_data = data.get("reports")
+        if not reports_data or not isinstance(reports_data, list):
+            return jsonify({"error": "Lista de relatórios é obrigatória"}), 400
+        if len(reports_data) > _MAX_BATCH_REPORTS:
+            return jsonify({"error": f"Máximo de {_MAX_BATCH_REPORTS} relatórios por lote"}), 413
+
+        try:
+            reports = [ReportData.model_validate(report_data) for report_data in reports_data]
+        except ValidationError as e:
+            return jsonify({"error": f"Dados do relatório inválidos: {e.errors(include_url=False, include_context=False)}"}), 400
+
+        filename = _download_filename("relatorios_arqueologia", data.get("user_id", "anonymous"))
+
+        return Response(
+            generate_batch(reports),
+            mimetype='application/pdf',
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        )
+
+    except Exception as e:
+        logger.error(f"Erro na geração de PDFs em lote: {e}")
+        return jsonify({"error": f"Erro interno: {str(e)}"}), 500
+
 @pdf_bp.route("/generate", methods=["POST"])
 def generate_pdf_legacy():
     return generate_pdf()
-
-